@@ -1,875 +1,1356 @@
 import os
 import argparse
 from tree_sitter import Language, Parser
-import platform 
-import re 
+import re
 import sys
-import inspect
-from collections import defaultdict
-
-# Added common C++ build output folders to exclusion list
-excluded_dir_names = ['.git', 'obj', 'bin', 'venv', '.vs', 'node_modules', 'tmp', 'temp', 'tmp_project_files', 'x64', 'Debug', 'Release', 'Profiling']
+import io
+import contextlib
+import threading
+import functools
+import hashlib
+import sqlite3
+import importlib
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Added common C++ build output folders to exclusion list.
+# A frozenset, since every directory met during the walk is checked against it.
+excluded_dir_names = frozenset({'.git', 'obj', 'bin', 'venv', '.vs', 'node_modules', 'tmp', 'temp', 'tmp_project_files', 'x64', 'Debug', 'Release', 'Profiling'})
+
+# Indentation prefixes by nesting level, so emitting a line doesn't build a new one each time.
+_MAX_INDENTS = 64
+_INDENTS = tuple("  " * i for i in range(_MAX_INDENTS))
+
+# Files bigger than this are listed but not parsed: their syntax trees get huge,
+# and they are almost always generated or bundled code anyway.
+MAX_PARSE_BYTES = 5 * 1024 * 1024
+# The limit in effect, set by --max_file_bytes (0 means no limit)
+_max_parse_bytes = MAX_PARSE_BYTES
+
+# Source files never contain NUL bytes, so one this close to the start marks a binary
+# (or UTF-16) file with a source extension, which would only parse into noise.
+BINARY_SNIFF_BYTES = 8192
+
+# With fewer files than this, starting worker processes (each importing the
+# languages and building parsers) costs more than it saves.
+MIN_FILES_FOR_POOL = 8
+
+# Regexes used on every file are compiled once, here.
+_CSHTML_HAS_CODE = re.compile(r"@(?:functions|code)\b", re.IGNORECASE)
+_CSHTML_CODE_BLOCK = re.compile(r"@(?:functions|code)\s*\{([\s\S]*?)\s*\}", re.IGNORECASE | re.DOTALL)
+_CS_USING_KEYWORD = re.compile(r"^using\s+")
+
+# Set by --verbose: also print the language loading progress, not just its warnings and errors.
+_verbose = False
+
+
+# Pip package module, language name for messages, and what is unavailable without it.
+LANGUAGE_PACKAGES = {
+    "csharp": ("tree_sitter_c_sharp", "C#", "C#"),
+    "javascript": ("tree_sitter_javascript", "JavaScript", "JavaScript"),
+    "html": ("tree_sitter_html", "HTML", "HTML/CSHTML"),
+    "python": ("tree_sitter_python", "Python", "Python"),
+    "cpp": ("tree_sitter_cpp", "C++", "C/C++"),
+}
+
+
+def get_package_version(package_name):
+    """Returns the installed version of a pip package, or None if its metadata can't be read."""
+    try:
+        # Imported here: only the --verbose banner and the summary cache need it
+        from importlib import metadata
+        return metadata.version(package_name)
+    except Exception:
+        return None
 
 
-def load_pip_languages():
+def load_pip_language(lang_name):
     """
-    Loads tree-sitter languages from installed pip packages.
-    Returns PyCapsule objects.
+    Loads one tree-sitter language from its installed pip package.
+    Returns its PyCapsule, or None if the package is missing or broken.
     """
-    CSHARP_LANG_CAPSULE = None
-    JAVASCRIPT_LANG_CAPSULE = None
-    HTML_LANG_CAPSULE = None
-    PYTHON_LANG_CAPSULE = None
-    CPP_LANG_CAPSULE = None
-
-    print("Attempting to load languages from installed pip packages...")
-    print(f"Python sys.path: {sys.path}") 
-
+    module_name, label, unavailable = LANGUAGE_PACKAGES[lang_name]
     try:
-        from tree_sitter_c_sharp import language as ts_csharp_lang_func 
-        CSHARP_LANG_CAPSULE = ts_csharp_lang_func() 
-        print("Successfully loaded C# language capsule.")
+        capsule = importlib.import_module(module_name).language()
+        if _verbose:
+            print(f"Successfully loaded {label} language capsule.")
+        return capsule
     except ImportError:
-        print("Warning: tree-sitter-c-sharp package not found. C# parsing will be unavailable.")
+        package_name = module_name.replace("_", "-")
+        print(f"Warning: {package_name} package not found. {unavailable} parsing will be unavailable.")
     except Exception as e:
-        print(f"Error loading C# language from package: {e}")
+        print(f"Error loading {label} language from package: {e}")
+    return None
 
-    try:
-        from tree_sitter_javascript import language as ts_javascript_lang_func
-        JAVASCRIPT_LANG_CAPSULE = ts_javascript_lang_func()
-        print("Successfully loaded JavaScript language capsule.")
-    except ImportError:
-        print("Warning: tree-sitter-javascript package not found. JavaScript parsing will be unavailable.")
-    except Exception as e:
-        print(f"Error loading JavaScript language from package: {e}")
 
+# --- Helpers for files, nodes and queries ---
+def read_source_bytes(file_path):
+    """
+    Reads a whole file as bytes with one read sized from fstat(),
+    skipping the buffered file object and its growing reads.
+    """
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
     try:
-        from tree_sitter_html import language as ts_html_lang_func
-        HTML_LANG_CAPSULE = ts_html_lang_func()
-        print("Successfully loaded HTML language capsule.")
-    except ImportError:
-        print("Warning: tree-sitter-html package not found. HTML/CSHTML parsing will be unavailable.")
-    except Exception as e:
-        print(f"Error loading HTML language from package: {e}")
+        size = os.fstat(fd).st_size
+        source_bytes = os.read(fd, size)
+        while len(source_bytes) < size: # short read, keep going until EOF
+            chunk = os.read(fd, size - len(source_bytes))
+            if not chunk:
+                break
+            source_bytes += chunk
+        return source_bytes
+    finally:
+        os.close(fd)
 
-    try:
-        from tree_sitter_python import language as ts_python_lang_func
-        PYTHON_LANG_CAPSULE = ts_python_lang_func()
-        print("Successfully loaded Python language capsule.")
-    except ImportError:
-        print("Warning: tree-sitter-python package not found. Python parsing will be unavailable.")
-    except Exception as e:
-        print(f"Error loading Python language from package: {e}")
 
-    try:
-        from tree_sitter_cpp import language as ts_cpp_lang_func
-        CPP_LANG_CAPSULE = ts_cpp_lang_func()
-        print("Successfully loaded C++ language capsule.")
-    except ImportError:
-        print("Warning: tree-sitter-cpp package not found. C/C++ parsing will be unavailable.")
-    except Exception as e:
-        print(f"Error loading C++ language from package: {e}")
+def looks_binary(source_bytes):
+    """True if a NUL byte shows up in the first BINARY_SNIFF_BYTES of the file."""
+    return source_bytes.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0
 
 
-    if not any([CSHARP_LANG_CAPSULE, JAVASCRIPT_LANG_CAPSULE, HTML_LANG_CAPSULE, PYTHON_LANG_CAPSULE, CPP_LANG_CAPSULE]):
-        print("Error: No tree-sitter language packages could be loaded.")
-        print("Please ensure you have installed the necessary packages, e.g.:")
-        print("  pip install tree-sitter-c-sharp tree-sitter-javascript tree-sitter-html tree-sitter-python tree-sitter-cpp")
-        return None
+def query_nodes(query, node):
+    """Runs query on node and returns the captured nodes in document order."""
+    captures = query.captures(node)
+    if isinstance(captures, dict):
+        # tree-sitter >= 0.23 groups the nodes by capture name
+        nodes = [n for capture_nodes in captures.values() for n in capture_nodes]
+    else:
+        nodes = [n for n, _ in captures]
+    nodes.sort(key=lambda n: n.start_byte)
+    return nodes
+
+
+def decode_for_slicing(source_bytes):
+    """
+    Returns the source as get_node_text() should slice it.
+    Pure-ASCII sources are decoded once, up front: their byte offsets are also
+    character offsets, so node text becomes a plain str slice. Anything else
+    stays as bytes and is decoded node by node.
+    """
+    if source_bytes.isascii():
+        return source_bytes.decode("ascii")
+    return source_bytes
 
-    return CSHARP_LANG_CAPSULE, JAVASCRIPT_LANG_CAPSULE, HTML_LANG_CAPSULE, PYTHON_LANG_CAPSULE, CPP_LANG_CAPSULE
 
+def join_lines(text, separator):
+    """Strips every line of text and joins the non-blank ones with separator (used to re-indent parameter lists)."""
+    return separator.join([line for line in (raw_line.strip() for raw_line in text.splitlines()) if line])
 
-# --- Helper to get text from a node ---
-def get_node_text(node, source_bytes, default=""):
-    """Safely gets text from a node, returning default if node is None."""
+
+def get_node_text(node, source, default=""):
+    """Safely gets text from a node, returning default if node is None. source is bytes or an ASCII str."""
     if not node:
         return default
-    return source_bytes[node.start_byte:node.end_byte].decode("utf8", errors="replace")
+    text = source[node.start_byte:node.end_byte]
+    if isinstance(text, bytes):
+        # Even in non-ASCII files most nodes are plain ASCII identifiers
+        if text.isascii():
+            return text.decode("ascii")
+        return text.decode("utf8", errors="replace")
+    return text
 
 # --- C# Analysis ---
-def analyze_csharp_node(node, source_bytes, summary, usings_list, indent_level=0):
-    indent = "  " * indent_level
+def get_csharp_declarators(node):
+    """
+    Returns (type_node, declarators) of a field or event declaration, in one pass over its children.
+    Declarators are either direct children or nested in a variable_declaration (attributes/modern grammar).
+    """
+    type_node = node.child_by_field_name("type")
+    declarators = []
+    for child in node.children:
+        child_type = child.type
+        if child_type == "variable_declarator":
+            declarators.append(child)
+        elif child_type == "variable_declaration":
+            if not type_node: type_node = child.child_by_field_name("type")
+            declarators.extend(sub_child for sub_child in child.children if sub_child.type == "variable_declarator")
+    return type_node, declarators
+
+
+def _cs_compilation_unit(node, source, summary, usings, stack, indent_level, indent):
+    stack.extend((child, indent_level) for child in reversed(node.children))
+
+
+def _cs_using_directive(node, source, summary, usings, stack, indent_level, indent):
+    # (Using logic remains same, just compacting logic here for brevity in the snippet)
+    alias_node = node.child_by_field_name("alias") 
+    name_node = node.child_by_field_name("name")  
+    static_node = node.child_by_field_name("static")
+
+    using_parts = []
+    if static_node: using_parts.append("static")
+    if alias_node:
+        alias_identifier = alias_node.child_by_field_name("name") 
+        alias_text = get_node_text(alias_identifier, source).strip()
+        if alias_text: using_parts.append(f"{alias_text} =")
+
+    namespace_str = get_node_text(name_node, source).strip()
+    if namespace_str: using_parts.append(namespace_str)
+
+    final_using_text = " ".join(filter(None, using_parts))
+    if final_using_text:
+        usings.add(final_using_text)
+    else:
+        # Fallback for complex usings
+        raw = get_node_text(node, source).strip()
+        raw = _CS_USING_KEYWORD.sub('', raw).rstrip(';')
+        if raw: usings.add(raw)
+
+
+def _cs_namespace_declaration(node, source, summary, usings, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    namespace_name = get_node_text(name_node, source, default="[UnknownNamespace]")
+    summary.append(f"{indent}namespace {namespace_name}")
+    body_node = node.child_by_field_name("body")
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
+
+
+def _cs_type_declaration(node, source, summary, usings, stack, indent_level, indent):
     node_type = node.type
+    name_node = node.child_by_field_name("name")
+    type_params_node = node.child_by_field_name("type_parameters")
+    name_str = get_node_text(name_node, source, default="[UnnamedType]")
+    if type_params_node:
+        name_str += get_node_text(type_params_node, source)
 
-    if node_type == "compilation_unit":
-        for child_idx in range(node.child_count):
-            analyze_csharp_node(node.child(child_idx), source_bytes, summary, usings_list, indent_level)
+    keyword = node_type.split('_')[0] # class, struct, interface...
+    summary.append(f"{indent}{keyword} {name_str}")
+
+    body_node = node.child_by_field_name("body")
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
 
-    elif node_type == "using_directive":
-        # (Using logic remains same, just compacting logic here for brevity in the snippet)
-        alias_node = node.child_by_field_name("alias") 
-        name_node = node.child_by_field_name("name")  
-        static_node = node.child_by_field_name("static")
-        
-        using_parts = []
-        if static_node: using_parts.append("static")
-        if alias_node:
-            alias_identifier = alias_node.child_by_field_name("name") 
-            alias_text = get_node_text(alias_identifier, source_bytes).strip()
-            if alias_text: using_parts.append(f"{alias_text} =")
-
-        namespace_str = get_node_text(name_node, source_bytes).strip()
-        if namespace_str: using_parts.append(namespace_str)
-        
-        final_using_text = " ".join(filter(None, using_parts))
-        if final_using_text:
-            usings_list.append(final_using_text)
-        else:
-            # Fallback for complex usings
-            raw = get_node_text(node, source_bytes).strip()
-            raw = re.sub(r'^using\s+', '', raw).rstrip(';')
-            if raw: usings_list.append(raw)
-
-    elif node_type == "namespace_declaration":
-        name_node = node.child_by_field_name("name")
-        namespace_name = get_node_text(name_node, source_bytes, default="[UnknownNamespace]")
-        summary.append(f"{indent}namespace {namespace_name}")
-        body_node = node.child_by_field_name("body")
-        if body_node:
-            for child_idx in range(body_node.child_count):
-                analyze_csharp_node(body_node.child(child_idx), source_bytes, summary, usings_list, indent_level + 1)
-
-    elif node_type in ["class_declaration", "struct_declaration", "interface_declaration", "enum_declaration", "record_declaration"]:
-        name_node = node.child_by_field_name("name")
-        type_params_node = node.child_by_field_name("type_parameters")
-        name_str = get_node_text(name_node, source_bytes, default="[UnnamedType]")
-        if type_params_node:
-            name_str += get_node_text(type_params_node, source_bytes)
-
-        keyword = node_type.split('_')[0] # class, struct, interface...
-        summary.append(f"{indent}{keyword} {name_str}")
-        
-        body_node = node.child_by_field_name("body")
-        if body_node:
-            for child_idx in range(body_node.child_count):
-                analyze_csharp_node(body_node.child(child_idx), source_bytes, summary, usings_list, indent_level + 1)
-
-    elif node_type == "method_declaration":
-        return_type_node = node.child_by_field_name("type")
-        name_node = node.child_by_field_name("name")
-        explicit_specifier = node.child_by_field_name("explicit_interface_specifier")
-        params_node = node.child_by_field_name("parameters")
 
-        method_name = ""
-        if name_node:
-            method_name = get_node_text(name_node, source_bytes)
-        elif explicit_specifier:
-            method_name = get_node_text(explicit_specifier, source_bytes)
+def _cs_method_declaration(node, source, summary, usings, stack, indent_level, indent):
+    return_type_node = node.child_by_field_name("type")
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+
+    method_name = ""
+    if name_node:
+        method_name = get_node_text(name_node, source)
+    else:
+        # The explicit interface specifier is only looked up when there's no plain name
+        explicit_specifier = node.child_by_field_name("explicit_interface_specifier")
+        if explicit_specifier:
+            method_name = get_node_text(explicit_specifier, source)
         else:
             # Fallback scan
-            found_id = next((c for c in node.children if c.type == 'identifier'), None)
-            method_name = get_node_text(found_id, source_bytes) if found_id else "[UnknownMethod]"
-
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        if '\n' in params_text:
-            next_line_indent = indent + "  "
-            params_text = re.sub(r'\s*[\r\n]+\s*', '\n' + next_line_indent, params_text.strip())
-
-        return_type_text = get_node_text(return_type_node, source_bytes).strip()
-        if not return_type_text:
-            return_type_text = "void" # Default to void if parsing fails or it's void
-
-        summary.append(f"{indent}{return_type_text} {method_name}{params_text}")
-
-    elif node_type == "constructor_declaration":
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        name_text = get_node_text(name_node, source_bytes, default="[Constructor]")
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        if '\n' in params_text:
-            next_line_indent = indent + "  "
-            params_text = re.sub(r'\s*[\r\n]+\s*', '\n' + next_line_indent, params_text.strip())
-        summary.append(f"{indent}{name_text}{params_text}")
-
-    elif node_type == "destructor_declaration":
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        name_text = get_node_text(name_node, source_bytes, default="[Destructor]")
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        summary.append(f"{indent}~{name_text}{params_text}")
-
-    elif node_type == "field_declaration":
-        # Robust Logic from previous step
-        type_node = node.child_by_field_name("type")
-        declarators = []
-
-        # 1. Direct children
-        for child in node.children:
-            if child.type == "variable_declarator":
-                declarators.append(child)
-        
-        # 2. Nested variable_declaration (for attributes/modern grammar)
-        if not declarators:
+            method_name = "[UnknownMethod]"
             for child in node.children:
-                if child.type == "variable_declaration":
-                    if not type_node: type_node = child.child_by_field_name("type")
-                    for sub_child in child.children:
-                        if sub_child.type == "variable_declarator":
-                            declarators.append(sub_child)
-
-        type_text = get_node_text(type_node, source_bytes, default="<unknown_type>").strip()
-
-        if declarators:
-            for decl in declarators:
-                name_node = decl.child_by_field_name("name")
-                name_text = get_node_text(name_node, source_bytes, default="[UnnamedField]")
-                # Format: "Type Name;"
-                summary.append(f"{indent}{type_text} {name_text};")
-        else:
-            summary.append(f"{indent}{type_text} [ComplexField];")
+                if child.type == 'identifier':
+                    method_name = get_node_text(child, source)
+                    break
+
+    params_text = get_node_text(params_node, source, default="()")
+    if '\n' in params_text:
+        next_line_indent = indent + "  "
+        params_text = join_lines(params_text, '\n' + next_line_indent)
+
+    return_type_text = get_node_text(return_type_node, source).strip()
+    if not return_type_text:
+        return_type_text = "void" # Default to void if parsing fails or it's void
+
+    summary.append(f"{indent}{return_type_text} {method_name}{params_text}")
+
+
+def _cs_constructor_declaration(node, source, summary, usings, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+    name_text = get_node_text(name_node, source, default="[Constructor]")
+    params_text = get_node_text(params_node, source, default="()")
+    if '\n' in params_text:
+        next_line_indent = indent + "  "
+        params_text = join_lines(params_text, '\n' + next_line_indent)
+    summary.append(f"{indent}{name_text}{params_text}")
+
+
+def _cs_destructor_declaration(node, source, summary, usings, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+    name_text = get_node_text(name_node, source, default="[Destructor]")
+    params_text = get_node_text(params_node, source, default="()")
+    summary.append(f"{indent}~{name_text}{params_text}")
+
+
+def _cs_field_declaration(node, source, summary, usings, stack, indent_level, indent):
+    type_node, declarators = get_csharp_declarators(node)
+    type_text = get_node_text(type_node, source, default="<unknown_type>").strip()
+
+    if declarators:
+        for decl in declarators:
+            name_node = decl.child_by_field_name("name")
+            name_text = get_node_text(name_node, source, default="[UnnamedField]")
+            # Format: "Type Name;"
+            summary.append(f"{indent}{type_text} {name_text};")
+    else:
+        summary.append(f"{indent}{type_text} [ComplexField];")
+
 
-    elif node_type == "property_declaration":
-        type_node = node.child_by_field_name("type")
-        name_node = node.child_by_field_name("name")
+def _cs_property_declaration(node, source, summary, usings, stack, indent_level, indent):
+    type_node = node.child_by_field_name("type")
+    name_node = node.child_by_field_name("name")
+
+    type_text = get_node_text(type_node, source, default="<unknown_type>")
+    name_text = ""
+    if name_node:
+        name_text = get_node_text(name_node, source)
+    else:
         explicit_specifier = node.child_by_field_name("explicit_interface_specifier")
+        name_text = get_node_text(explicit_specifier, source, default="[UnnamedProperty]")
 
-        type_text = get_node_text(type_node, source_bytes, default="<unknown_type>")
-        name_text = ""
-        if name_node:
-            name_text = get_node_text(name_node, source_bytes)
-        elif explicit_specifier:
-            name_text = get_node_text(explicit_specifier, source_bytes)
-        else:
-            name_text = "[UnnamedProperty]"
-        
-        # Format: "Type Name { get; }" to distinguish from field
-        summary.append(f"{indent}{type_text} {name_text} {{ get; }}")
-
-    elif node_type == "event_field_declaration": 
-        type_node = node.child_by_field_name("type")
-        declarators = []
-        for child in node.children:
-             if child.type == "variable_declarator": declarators.append(child)
-        if not declarators:
-             for child in node.children:
-                 if child.type == "variable_declaration":
-                     if not type_node: type_node = child.child_by_field_name("type")
-                     for sub_child in child.children:
-                         if sub_child.type == "variable_declarator": declarators.append(sub_child)
-
-        type_text = get_node_text(type_node, source_bytes, default="<unknown_type>").strip()
-
-        if declarators:
-            for decl in declarators:
-                name_node = decl.child_by_field_name("name")
-                name_text = get_node_text(name_node, source_bytes, default="[UnnamedEvent]")
-                summary.append(f"{indent}event {type_text} {name_text};")
-        else:
-            summary.append(f"{indent}event {type_text} [ComplexEvent];")
+    # Format: "Type Name { get; }" to distinguish from field
+    summary.append(f"{indent}{type_text} {name_text} {{ get; }}")
 
-    elif node_type == "delegate_declaration":
-        return_type_node = node.child_by_field_name("return_type")
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        
-        ret_text = get_node_text(return_type_node, source_bytes, default="void")
-        name_text = get_node_text(name_node, source_bytes, default="[Delegate]")
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        
-        summary.append(f"{indent}delegate {ret_text} {name_text}{params_text};")
 
+def _cs_event_field_declaration(node, source, summary, usings, stack, indent_level, indent):
+    type_node, declarators = get_csharp_declarators(node)
+    type_text = get_node_text(type_node, source, default="<unknown_type>").strip()
 
-def process_csharp(file_path, parser, summary):
+    if declarators:
+        for decl in declarators:
+            name_node = decl.child_by_field_name("name")
+            name_text = get_node_text(name_node, source, default="[UnnamedEvent]")
+            summary.append(f"{indent}event {type_text} {name_text};")
+    else:
+        summary.append(f"{indent}event {type_text} [ComplexEvent];")
+
+
+def _cs_delegate_declaration(node, source, summary, usings, stack, indent_level, indent):
+    return_type_node = node.child_by_field_name("return_type")
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+
+    ret_text = get_node_text(return_type_node, source, default="void")
+    name_text = get_node_text(name_node, source, default="[Delegate]")
+    params_text = get_node_text(params_node, source, default="()")
+
+    summary.append(f"{indent}delegate {ret_text} {name_text}{params_text};")
+
+
+_CSHARP_HANDLERS = {
+    "compilation_unit": _cs_compilation_unit,
+    "using_directive": _cs_using_directive,
+    "namespace_declaration": _cs_namespace_declaration,
+    "class_declaration": _cs_type_declaration,
+    "struct_declaration": _cs_type_declaration,
+    "interface_declaration": _cs_type_declaration,
+    "enum_declaration": _cs_type_declaration,
+    "record_declaration": _cs_type_declaration,
+    "method_declaration": _cs_method_declaration,
+    "constructor_declaration": _cs_constructor_declaration,
+    "destructor_declaration": _cs_destructor_declaration,
+    "field_declaration": _cs_field_declaration,
+    "property_declaration": _cs_property_declaration,
+    "event_field_declaration": _cs_event_field_declaration,
+    "delegate_declaration": _cs_delegate_declaration,
+}
+
+
+def analyze_csharp_node(node, source, summary, usings, indent_level=0):
+    handlers = get_kind_handlers("csharp", _CSHARP_HANDLERS)
+    stack = [(node, indent_level)]
+    while stack:
+        node, indent_level = stack.pop()
+        handler = handlers.get(node.kind_id)
+        if handler:
+            indent = _INDENTS[indent_level] if indent_level < _MAX_INDENTS else "  " * indent_level
+            handler(node, source, summary, usings, stack, indent_level, indent)
+
+
+def process_csharp(file_path, source_bytes):
+    parser = get_parser("csharp")
+    summary = []
     file_summary = []
-    usings_list = []
+    usings = set()
     if not parser:
-        return
+        return summary
     try:
-        with open(file_path, "rb") as f:
-            source_bytes = f.read()
         tree = parser.parse(source_bytes)
-        analyze_csharp_node(tree.root_node, source_bytes, file_summary, usings_list)
+        analyze_csharp_node(tree.root_node, decode_for_slicing(source_bytes), file_summary, usings)
         
-        if file_summary or usings_list:
+        if file_summary or usings:
             summary.append(f"\n-- FILE: {file_path} (C#) --")
-            if usings_list:
-                summary.append(f"  USINGS: {', '.join(sorted(list(set(usings_list))))}")
-            summary.extend(file_summary)
+            if usings:
+                summary.append(f"  USINGS: {', '.join(sorted(usings))}")
+            if file_summary:
+                summary.append("\n".join(file_summary))
     except Exception as e:
         summary.append(f"\n-- FILE: {file_path} (C#) --")
         summary.append(f"  Error processing {file_path}: {e}")
+    return summary
 
 # --- JavaScript Analysis ---
-def analyze_javascript_node(node, source_bytes, summary, indent_level=0):
-    indent = "  " * indent_level
-    node_type = node.type
+def _js_program(node, source, summary, stack, indent_level, indent):
+    stack.extend((child, indent_level) for child in reversed(node.children))
+
+
+def _js_function_declaration(node, source, summary, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+    func_name = get_node_text(name_node, source, default="[anonymous_function]")
+    params_text = get_node_text(params_node, source, default="()")
+    if '\n' in params_text:
+        next_line_indent = indent + "  "
+        params_text = join_lines(params_text, '\n' + next_line_indent)
+    summary.append(f"{indent}FUNC: {func_name}{params_text}") 
+
+
+def _js_class_declaration(node, source, summary, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    class_name = get_node_text(name_node, source, default="[UnnamedClass]")
+    summary.append(f"{indent}CLASS: {class_name}")
+    body_node = node.child_by_field_name("body")
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children) if child.type == "method_definition")
+
+
+def _js_method_definition(node, source, summary, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+    kind_node = node.child_by_field_name("kind") 
+
+    method_name = get_node_text(name_node, source, default="[unnamed_method]")
+    params_text = get_node_text(params_node, source, default="()")
+    if '\n' in params_text:
+        next_line_indent = indent + "  "
+        params_text = join_lines(params_text, '\n' + next_line_indent)
+    kind_text = get_node_text(kind_node, source) 
+
+    prefix = "METHOD"
+    if method_name == "constructor":
+        prefix = "CONSTRUCTOR"
+    elif kind_text == "get": prefix = "GETTER"
+    elif kind_text == "set": prefix = "SETTER"
+    summary.append(f"{indent}{prefix}: {method_name}{params_text}")
+
+
+def _js_variable_declaration(node, source, summary, stack, indent_level, indent):
+    children = node.children
+    kind_token_node = children[0] if children else None
+    kind_token_text = get_node_text(kind_token_node, source).upper() if kind_token_node else "VAR"
+
+    for child_decl in children:
+        if child_decl.type == "variable_declarator":
+            name_node = child_decl.child_by_field_name("name")
+            name_text = get_node_text(name_node, source, default="[unnamed_variable]")
+            value_node = child_decl.child_by_field_name("value")
+            if value_node and value_node.type == "arrow_function":
+                arrow_params_node = value_node.child_by_field_name("parameters")
+                arrow_params_text = get_node_text(arrow_params_node, source, default="()")
+                summary.append(f"{indent}ARROW_FUNCTION ({kind_token_text}): {name_text}{arrow_params_text}")
+            else:
+                summary.append(f"{indent}VARIABLE ({kind_token_text}): {name_text}")
 
-    if node_type == "program":
-        for child_idx in range(node.child_count):
-            analyze_javascript_node(node.child(child_idx), source_bytes, summary, indent_level)
-    elif node_type == "function_declaration":
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        func_name = get_node_text(name_node, source_bytes, default="[anonymous_function]")
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        if '\n' in params_text:
-            next_line_indent = indent + "  "
-            params_text = re.sub(r'\s*[\r\n]+\s*', '\n' + next_line_indent, params_text.strip())
-        summary.append(f"{indent}FUNC: {func_name}{params_text}") 
-    elif node_type == "class_declaration":
-        name_node = node.child_by_field_name("name")
-        class_name = get_node_text(name_node, source_bytes, default="[UnnamedClass]")
-        summary.append(f"{indent}CLASS: {class_name}")
-        body_node = node.child_by_field_name("body")
-        if body_node:
-            for child_idx in range(body_node.child_count):
-                 method_node = body_node.child(child_idx)
-                 if method_node.type == "method_definition": 
-                    analyze_javascript_node(method_node, source_bytes, summary, indent_level + 1)
-    elif node_type == "method_definition":
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        kind_node = node.child_by_field_name("kind") 
-        
-        method_name = get_node_text(name_node, source_bytes, default="[unnamed_method]")
-        params_text = get_node_text(params_node, source_bytes, default="()")
-        if '\n' in params_text:
-            next_line_indent = indent + "  "
-            params_text = re.sub(r'\s*[\r\n]+\s*', '\n' + next_line_indent, params_text.strip())
-        kind_text = get_node_text(kind_node, source_bytes) 
-
-        prefix = "METHOD"
-        if method_name == "constructor":
-            prefix = "CONSTRUCTOR"
-        elif kind_text == "get": prefix = "GETTER"
-        elif kind_text == "set": prefix = "SETTER"
-        summary.append(f"{indent}{prefix}: {method_name}{params_text}")
-
-    elif node_type == "lexical_declaration" or node_type == "variable_declaration":
-        kind_token_node = node.child(0) 
-        kind_token_text = get_node_text(kind_token_node, source_bytes).upper() if kind_token_node else "VAR"
-
-        for child_idx in range(node.child_count): 
-            child_decl = node.child(child_idx)
-            if child_decl.type == "variable_declarator":
-                name_node = child_decl.child_by_field_name("name")
-                name_text = get_node_text(name_node, source_bytes, default="[unnamed_variable]")
-                value_node = child_decl.child_by_field_name("value")
-                if value_node and value_node.type == "arrow_function":
-                    arrow_params_node = value_node.child_by_field_name("parameters")
-                    arrow_params_text = get_node_text(arrow_params_node, source_bytes, default="()")
-                    summary.append(f"{indent}ARROW_FUNCTION ({kind_token_text}): {name_text}{arrow_params_text}")
-                else:
-                    summary.append(f"{indent}VARIABLE ({kind_token_text}): {name_text}")
-
-def process_javascript(file_path, parser, summary):
+
+_JAVASCRIPT_HANDLERS = {
+    "program": _js_program,
+    "function_declaration": _js_function_declaration,
+    "class_declaration": _js_class_declaration,
+    "method_definition": _js_method_definition,
+    "lexical_declaration": _js_variable_declaration,
+    "variable_declaration": _js_variable_declaration,
+}
+
+
+def analyze_javascript_node(node, source, summary, indent_level=0):
+    handlers = get_kind_handlers("javascript", _JAVASCRIPT_HANDLERS)
+    stack = [(node, indent_level)]
+    while stack:
+        node, indent_level = stack.pop()
+        handler = handlers.get(node.kind_id)
+        if handler:
+            indent = _INDENTS[indent_level] if indent_level < _MAX_INDENTS else "  " * indent_level
+            handler(node, source, summary, stack, indent_level, indent)
+
+
+def process_javascript(file_path, source_bytes):
+    parser = get_parser("javascript")
+    summary = []
     file_summary = []
     if not parser:
-        return
+        return summary
     try:
-        with open(file_path, "rb") as f:
-            source_bytes = f.read()
         tree = parser.parse(source_bytes)
-        analyze_javascript_node(tree.root_node, source_bytes, file_summary)
+        analyze_javascript_node(tree.root_node, decode_for_slicing(source_bytes), file_summary)
         if file_summary:
             summary.append(f"\n-- FILE: {file_path} (JavaScript) --")
-            summary.extend(file_summary)
+            summary.append("\n".join(file_summary))
     except Exception as e:
         summary.append(f"\n-- FILE: {file_path} (JavaScript) --")
         summary.append(f"  Error processing {file_path}: {e}")
+    return summary
 
 # --- CSHTML Analysis (Simplified) ---
-def analyze_cshtml_node(node, source_bytes, summary, js_parser, cs_parser, indent_level=0):
-    indent = "  " * indent_level
-    node_type = node.type
+CSHTML_QUERY = "(script_element) @script (text) @text"
+CSHTML_DIRECTIVES = ("@page", "@model", "@using", "@inject")
 
-    if node_type == "script_element":
-        summary.append(f"{indent}SCRIPT BLOCK:")
-        script_content_node = None
-        if node.child_count > 2 and node.child(1).type == "raw_text": 
-             script_content_node = node.child(1)
-        elif node.child_by_field_name("text"): 
-            script_content_node = node.child_by_field_name("text")
-
-        if script_content_node and js_parser:
-            script_text_bytes = get_node_text(script_content_node, source_bytes).encode('utf8')
-            if script_text_bytes.strip(): 
-                try:
-                    js_tree = js_parser.parse(script_text_bytes)
-                    analyze_javascript_node(js_tree.root_node, script_text_bytes, summary, indent_level + 1)
-                except Exception as e:
-                    summary.append(f"{indent}  Error parsing JS in script block: {e}")
-        elif not js_parser and script_content_node and get_node_text(script_content_node, source_bytes).strip():
-             summary.append(f"{indent}  JavaScript parser not available for script block.")
-        return 
-
-    if node_type == "text" or node_type == "template_content":
-        text_content = get_node_text(node, source_bytes)
-        if re.search(r"@(?:functions|code)\b", text_content, re.IGNORECASE):
-            summary.append(f"{indent}CSHTML C# BLOCK (@functions/@code) DETECTED.")
-            match = re.search(r"@(?:functions|code)\s*\{([\s\S]*?)\s*\}", text_content, re.IGNORECASE | re.DOTALL)
-            if match and cs_parser:
-                csharp_code_in_block = match.group(1).strip()
-                if csharp_code_in_block:
-                    csharp_code_bytes = csharp_code_in_block.encode('utf-8')
+def analyze_cshtml_node(node, source_bytes, summary, js_parser, cs_parser, indent_level=0):
+    indent = _INDENTS[indent_level] if indent_level < _MAX_INDENTS else "  " * indent_level
+    # Only script elements and text nodes matter here, so let a query find them
+    # natively instead of visiting every HTML node from Python.
+    for node in query_nodes(get_query("html", CSHTML_QUERY), node):
+        node_type = node.type
+
+        if node_type == "script_element":
+            summary.append(f"{indent}SCRIPT BLOCK:")
+            script_content_node = None
+            children = node.children
+            if len(children) > 2 and children[1].type == "raw_text": 
+                 script_content_node = children[1]
+            elif node.child_by_field_name("text"): 
+                script_content_node = node.child_by_field_name("text")
+
+            if script_content_node and js_parser:
+                script_text_bytes = get_node_text(script_content_node, source_bytes).encode('utf8')
+                if script_text_bytes.strip(): 
                     try:
-                        cs_tree = cs_parser.parse(csharp_code_bytes)
-                        analyze_csharp_node(cs_tree.root_node, csharp_code_bytes, summary, [], indent_level + 1)
+                        js_tree = js_parser.parse(script_text_bytes)
+                        analyze_javascript_node(js_tree.root_node, decode_for_slicing(script_text_bytes), summary, indent_level + 1)
                     except Exception as e:
-                        summary.append(f"{indent}    Error parsing C# in CSHTML block: {e}")
-            elif not cs_parser and match: 
-                 summary.append(f"{indent}  C# parser not available for CSHTML block.")
-    for child_idx in range(node.child_count):
-        analyze_cshtml_node(node.child(child_idx), source_bytes, summary, js_parser, cs_parser, indent_level)
-
-
-def process_cshtml(file_path, html_parser, js_parser, cs_parser, summary):
+                        summary.append(f"{indent}  Error parsing JS in script block: {e}")
+            elif not js_parser and script_content_node and get_node_text(script_content_node, source_bytes).strip():
+                 summary.append(f"{indent}  JavaScript parser not available for script block.")
+            continue
+
+        if node_type == "text":
+            # Most text nodes are plain markup: look for '@' in the raw bytes before decoding anything.
+            if source_bytes.find(b"@", node.start_byte, node.end_byte) < 0:
+                continue
+            text_content = get_node_text(node, source_bytes)
+            code_match = _CSHTML_HAS_CODE.search(text_content)
+            if code_match:
+                summary.append(f"{indent}CSHTML C# BLOCK (@functions/@code) DETECTED.")
+                # A block can't start before the first directive, so don't rescan the text leading up to it.
+                match = _CSHTML_CODE_BLOCK.search(text_content, code_match.start())
+                if match and cs_parser:
+                    csharp_code_in_block = match.group(1).strip()
+                    if csharp_code_in_block:
+                        csharp_code_bytes = csharp_code_in_block.encode('utf-8')
+                        try:
+                            cs_tree = cs_parser.parse(csharp_code_bytes)
+                            analyze_csharp_node(cs_tree.root_node, decode_for_slicing(csharp_code_bytes), summary, set(), indent_level + 1)
+                        except Exception as e:
+                            summary.append(f"{indent}    Error parsing C# in CSHTML block: {e}")
+                elif not cs_parser and match: 
+                     summary.append(f"{indent}  C# parser not available for CSHTML block.")
+
+
+def process_cshtml(file_path, source_bytes):
+    html_parser = get_parser("html")
+    js_parser = get_parser("javascript")
+    cs_parser = get_parser("csharp")
+    summary = []
     file_summary = []
     if not html_parser:
-        return
+        return summary
     try:
-        with open(file_path, "rb") as f:
-            source_bytes = f.read()
-
-        source_text_for_directives = source_bytes.decode('utf-8', errors='ignore')
-        for line_num, line in enumerate(source_text_for_directives.splitlines()):
-            if line_num > 30: 
+        # Directives are only looked for in the first 31 lines, so only decode up to the 32nd line break
+        header_end = -1
+        for _ in range(32):
+            header_end = source_bytes.find(b"\n", header_end + 1)
+            if header_end < 0:
                 break
+        header_bytes = source_bytes if header_end < 0 else source_bytes[:header_end + 1]
+        source_text_for_directives = header_bytes.decode('utf-8', errors='ignore')
+        for line in source_text_for_directives.splitlines()[:31]:
             stripped_line = line.strip()
-            if stripped_line.startswith("@page"):
-                file_summary.append(f"  DIRECTIVE: {stripped_line}")
-            elif stripped_line.startswith("@model"):
-                file_summary.append(f"  DIRECTIVE: {stripped_line}")
-            elif stripped_line.startswith("@using"): 
-                file_summary.append(f"  DIRECTIVE: {stripped_line}")
-            elif stripped_line.startswith("@inject"):
+            if stripped_line.startswith(CSHTML_DIRECTIVES):
                 file_summary.append(f"  DIRECTIVE: {stripped_line}")
 
         tree = html_parser.parse(source_bytes)
         analyze_cshtml_node(tree.root_node, source_bytes, file_summary, js_parser, cs_parser)
         if file_summary:
             summary.append(f"\n-- FILE: {file_path} (CSHTML) --")
-            summary.extend(file_summary)
+            summary.append("\n".join(file_summary))
     except Exception as e:
         summary.append(f"\n-- FILE: {file_path} (CSHTML) --")
         summary.append(f"  Error processing {file_path}: {e}")
+    return summary
 
 
-def analyze_python_node(node, source_bytes, summary, imports_list, indent_level=0):
-    indent = "  " * indent_level
-    node_type = node.type
+def _py_module(node, source, summary, imports, stack, indent_level, indent):
+    stack.extend((child, indent_level) for child in reversed(node.children))
 
-    if node_type == "module":
-        for child in node.children:
-            analyze_python_node(child, source_bytes, summary, imports_list, indent_level)
-    
-    elif node_type == "import_from_statement":
-        module_name_node = node.child_by_field_name("module_name")
-        module_name = get_node_text(module_name_node, source_bytes)
-        
-        imported_names_node = node.child_by_field_name("name")
-        imported_names = get_node_text(imported_names_node, source_bytes)
-        
-        imports_list.append(f"from {module_name} import {imported_names}")
-
-    elif node_type == "import_statement":
-        name_node = node.child_by_field_name("name")
-        module_name = get_node_text(name_node, source_bytes)
-        imports_list.append(f"import {module_name}")
-
-    elif node_type == "decorated_definition":
-        for child in node.children:
-            if child.type == "decorator":
-                summary.append(f"{indent}DECORATOR: @{get_node_text(child.child_by_field_name('name'), source_bytes)}")
-        definition_node = node.children[-1]
-        analyze_python_node(definition_node, source_bytes, summary, imports_list, indent_level)
-
-    elif node_type == "function_definition":
-        name_node = node.child_by_field_name("name")
-        params_node = node.child_by_field_name("parameters")
-        func_name = get_node_text(name_node, source_bytes, "[lambda]")
-        params_text = get_node_text(params_node, source_bytes, "()")
-        if '\n' in params_text:
-            next_line_indent = indent + "  "
-            params_text = re.sub(r'\s*[\r\n]+\s*', '\n' + next_line_indent, params_text.strip())
-        summary.append(f"{indent}FUNC: {func_name}{params_text}")
-        
-        body_node = node.child_by_field_name("body")
-        if body_node:
-            for child in body_node.children:
-                analyze_python_node(child, source_bytes, summary, imports_list, indent_level + 1)
-    
-    elif node_type == "class_definition":
-        name_node = node.child_by_field_name("name")
-        class_name = get_node_text(name_node, source_bytes)
-        
-        superclasses_node = node.child_by_field_name("superclasses")
-        superclasses_text = get_node_text(superclasses_node, source_bytes, "")
-        
-        summary.append(f"{indent}CLASS: {class_name}{superclasses_text}")
-        
-        body_node = node.child_by_field_name("body")
-        if body_node:
-            for child in body_node.children:
-                analyze_python_node(child, source_bytes, summary, imports_list, indent_level + 1)
 
+def _py_import_from_statement(node, source, summary, imports, stack, indent_level, indent):
+    module_name_node = node.child_by_field_name("module_name")
+    module_name = get_node_text(module_name_node, source)
+
+    imported_names_node = node.child_by_field_name("name")
+    imported_names = get_node_text(imported_names_node, source)
+
+    imports.add(f"from {module_name} import {imported_names}")
+
+
+def _py_import_statement(node, source, summary, imports, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    module_name = get_node_text(name_node, source)
+    imports.add(f"import {module_name}")
+
+
+def _py_decorated_definition(node, source, summary, imports, stack, indent_level, indent):
+    for child in node.children:
+        if child.type == "decorator":
+            summary.append(f"{indent}DECORATOR: @{get_node_text(child.child_by_field_name('name'), source)}")
+    # The definition is walked next, at the same level, before any sibling of the decorated node
+    stack.append((node.children[-1], indent_level))
+
+
+def _py_function_definition(node, source, summary, imports, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    params_node = node.child_by_field_name("parameters")
+    func_name = get_node_text(name_node, source, "[lambda]")
+    params_text = get_node_text(params_node, source, "()")
+    if '\n' in params_text:
+        next_line_indent = indent + "  "
+        params_text = join_lines(params_text, '\n' + next_line_indent)
+    summary.append(f"{indent}FUNC: {func_name}{params_text}")
+
+    body_node = node.child_by_field_name("body")
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
+
+
+def _py_class_definition(node, source, summary, imports, stack, indent_level, indent):
+    name_node = node.child_by_field_name("name")
+    class_name = get_node_text(name_node, source)
+
+    superclasses_node = node.child_by_field_name("superclasses")
+    superclasses_text = get_node_text(superclasses_node, source, "")
+
+    summary.append(f"{indent}CLASS: {class_name}{superclasses_text}")
 
-def process_python(file_path, parser, summary):
+    body_node = node.child_by_field_name("body")
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
+
+
+_PYTHON_HANDLERS = {
+    "module": _py_module,
+    "import_from_statement": _py_import_from_statement,
+    "import_statement": _py_import_statement,
+    "decorated_definition": _py_decorated_definition,
+    "function_definition": _py_function_definition,
+    "class_definition": _py_class_definition,
+}
+
+
+def analyze_python_node(node, source, summary, imports, indent_level=0):
+    handlers = get_kind_handlers("python", _PYTHON_HANDLERS)
+    stack = [(node, indent_level)]
+    while stack:
+        node, indent_level = stack.pop()
+        handler = handlers.get(node.kind_id)
+        if handler:
+            indent = _INDENTS[indent_level] if indent_level < _MAX_INDENTS else "  " * indent_level
+            handler(node, source, summary, imports, stack, indent_level, indent)
+
+
+def process_python(file_path, source_bytes):
     """Wrapper function to process a single Python file."""
+    parser = get_parser("python")
+    summary = []
     file_summary = []
-    imports_list = []
+    imports = set()
     if not parser:
-        return
+        return summary
     try:
-        with open(file_path, "rb") as f:
-            source_bytes = f.read()
         tree = parser.parse(source_bytes)
-        analyze_python_node(tree.root_node, source_bytes, file_summary, imports_list)
-        if file_summary or imports_list:
+        analyze_python_node(tree.root_node, decode_for_slicing(source_bytes), file_summary, imports)
+        if file_summary or imports:
             summary.append(f"\n-- FILE: {file_path} (Python) --")
-            if imports_list:
-                summary.append(f"  IMPORTS: {', '.join(sorted(list(set(imports_list))))}")
-            summary.extend(file_summary)
+            if imports:
+                summary.append(f"  IMPORTS: {', '.join(sorted(imports))}")
+            if file_summary:
+                summary.append("\n".join(file_summary))
     except Exception as e:
         summary.append(f"\n-- FILE: {file_path} (Python) --")
         summary.append(f"  Error processing {file_path}: {e}")
+    return summary
 
 
-def analyze_cpp_node(node, source_bytes, summary, includes_list, indent_level=0):
-    indent = "  " * indent_level
-    node_type = node.type
+def innermost_declarator(node, declarator_field_id):
+    """Follows the 'declarator' fields (pointers, references, arrays...) down to the innermost one."""
+    while True:
+        inner_node = node.child_by_field_id(declarator_field_id)
+        if not inner_node:
+            return node
+        node = inner_node
 
-    if node_type == 'translation_unit':
-        for child in node.children:
-            analyze_cpp_node(child, source_bytes, summary, includes_list, indent_level)
-
-    elif node_type == 'preproc_include':
-        path_node = node.child_by_field_name('path')
-        path_text = get_node_text(path_node, source_bytes)
-        includes_list.append(path_text)
-    
-    elif node_type == 'namespace_definition':
-        name_node = node.child_by_field_name('name')
-        name = get_node_text(name_node, source_bytes)
-        summary.append(f"{indent}NAMESPACE: {name}")
-        body_node = node.child_by_field_name('body')
-        if body_node:
-            for child in body_node.children:
-                analyze_cpp_node(child, source_bytes, summary, includes_list, indent_level + 1)
-
-    elif node_type in ['class_specifier', 'struct_specifier', 'union_specifier']:
-        if not node.child_by_field_name('body'):
-            return
-
-        type_keyword = node_type.split('_')[0].upper()
-        name_node = node.child_by_field_name('name')
-        name = get_node_text(name_node, source_bytes, default="[Anonymous]")
-        summary.append(f"{indent}{type_keyword}: {name}")
-        
-        body_node = node.child_by_field_name('body')
-        if body_node:
-            for child in body_node.children:
-                analyze_cpp_node(child, source_bytes, summary, includes_list, indent_level + 1)
-    
-    elif node_type == 'function_definition':
-        type_node = node.child_by_field_name('type')
-        declarator_node = node.child_by_field_name('declarator')
-        
-        if declarator_node:
-            name_node = declarator_node.child_by_field_name('declarator')
-            params_node = declarator_node.child_by_field_name('parameters')
-            
-            while name_node and name_node.type not in ['identifier', 'qualified_identifier', 'operator_name', 'destructor_name']:
-                 name_node = name_node.child_by_field_name('declarator')
-
-            func_name = get_node_text(name_node, source_bytes, '[unnamed_func]')
-            params_text = get_node_text(params_node, source_bytes, '()')
-            params_text = re.sub(r'\s*[\r\n]+\s*', ' ', params_text).strip()
-            
-            return_type = get_node_text(type_node, source_bytes, '').strip()
-            if return_type == "void":
-                return_type = "" # Omit void return type
-
-            prefix = "FUNC"
-            # Heuristic for constructor/destructor
-            if not return_type:
-                 if func_name.startswith("~"):
-                    prefix = "DESTRUCTOR"
-                 else:
-                    prefix = "CONSTRUCTOR"
-
-            full_sig = f"{return_type} {func_name}{params_text}".strip()
-            summary.append(f"{indent}{prefix}: {full_sig}")
-
-    elif node_type == 'declaration' or node_type == 'field_declaration':
-        func_declarator = next((c for c in node.children if 'function_declarator' in c.type), None)
-        if func_declarator:
-            type_node = node.child_by_field_name('type')
-            params_node = func_declarator.child_by_field_name('parameters')
-            name_node = func_declarator.child_by_field_name('declarator')
-
-            type_text = get_node_text(type_node, source_bytes).strip()
-            if type_text == "void":
-                type_text = "" # Omit void return type
-
-            func_name = get_node_text(name_node, source_bytes, '[unnamed_func]')
-            params_text = get_node_text(params_node, source_bytes, '()')
-            params_text = re.sub(r'\s*[\r\n]+\s*', ' ', params_text).strip()
-
-            full_sig = f"{type_text} {func_name}{params_text}".strip()
-            summary.append(f"{indent}FUNC_DECL: {full_sig}")
-            return
-
-        specifier_node = next((c for c in node.children if c.type in ['class_specifier', 'struct_specifier']), None)
-        if specifier_node and not specifier_node.child_by_field_name('body'):
-            declaration_text = get_node_text(node, source_bytes).strip().replace('\n', ' ').replace(';', '')
-            summary.append(f"{indent}FORWARD_DECL: {declaration_text}")
-            return
 
+def _cpp_translation_unit(node, source, summary, includes, stack, indent_level):
+    stack.extend((child, indent_level) for child in reversed(node.children))
+
+
+def _cpp_preproc_include(node, source, summary, includes, stack, indent_level):
+    path_node = node.child_by_field_name('path')
+    path_text = get_node_text(path_node, source)
+    includes.add(path_text)
+
+
+def _cpp_namespace_definition(node, source, summary, includes, stack, indent_level):
+    name_node = node.child_by_field_name('name')
+    name = get_node_text(name_node, source)
+    summary.append((indent_level, "NAMESPACE", name))
+    body_node = node.child_by_field_name('body')
+    if body_node:
+        stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
+
+
+# Literal (so interned) type keywords, rather than building them with split('_')[0].upper() for every node
+_CPP_TYPE_KEYWORDS = {"class_specifier": "CLASS", "struct_specifier": "STRUCT", "union_specifier": "UNION"}
+
+
+def _cpp_type_specifier(node, source, summary, includes, stack, indent_level):
+    body_node = node.child_by_field_name('body')
+    if not body_node:
+        return
+    type_keyword = _CPP_TYPE_KEYWORDS[node.type]
+    name_node = node.child_by_field_name('name')
+    name = get_node_text(name_node, source, default="[Anonymous]")
+    summary.append((indent_level, type_keyword, name))
+    stack.extend((child, indent_level + 1) for child in reversed(body_node.children))
+
+
+def _cpp_function_definition(node, source, summary, includes, stack, indent_level):
+    declarator_field_id = get_field_id("cpp", "declarator")
+    type_node = node.child_by_field_name('type')
+    declarator_node = node.child_by_field_name('declarator')
+
+    if declarator_node:
+        name_node = declarator_node.child_by_field_name('declarator')
+        params_node = declarator_node.child_by_field_name('parameters')
+
+        while name_node and name_node.type not in ['identifier', 'qualified_identifier', 'operator_name', 'destructor_name']:
+             name_node = name_node.child_by_field_id(declarator_field_id)
+
+        func_name = get_node_text(name_node, source, '[unnamed_func]')
+        params_text = get_node_text(params_node, source, '()')
+        params_text = join_lines(params_text, ' ') if '\n' in params_text or '\r' in params_text else params_text.strip()
+
+        return_type = get_node_text(type_node, source, '').strip()
+        if return_type == "void":
+            return_type = "" # Omit void return type
+
+        prefix = "FUNC"
+        # Heuristic for constructor/destructor
+        if not return_type:
+             if func_name.startswith("~"):
+                prefix = "DESTRUCTOR"
+             else:
+                prefix = "CONSTRUCTOR"
+
+        full_sig = f"{return_type} {func_name}{params_text}".strip()
+        summary.append((indent_level, prefix, full_sig))
+
+
+def _cpp_declaration(node, source, summary, includes, stack, indent_level):
+    declarator_field_id = get_field_id("cpp", "declarator")
+    # One pass over the children finds both the function declarator and the class/struct specifier
+    children = node.children
+    func_declarator = None
+    specifier_node = None
+    for child in children:
+        child_type = child.type
+        if 'function_declarator' in child_type:
+            func_declarator = child
+            break
+        if specifier_node is None and (child_type == 'class_specifier' or child_type == 'struct_specifier'):
+            specifier_node = child
+    if func_declarator:
         type_node = node.child_by_field_name('type')
-        type_text = get_node_text(type_node, source_bytes, '<unknown_type>').strip()
-        
-        for i in range(node.child_count):
-            child_node = node.child(i)
-            if 'declarator' in child_node.type:
-                name_node = child_node
-                while name_node.child_by_field_name('declarator'):
-                    name_node = name_node.child_by_field_name('declarator')
-                
-                name_text = get_node_text(name_node, source_bytes).strip()
-                
-                if name_text and name_text != type_text:
-                    summary.append(f"{indent}FIELD: {type_text} {name_text}")
-
-
-def process_cpp(file_path, parser, summary):
+        params_node = func_declarator.child_by_field_name('parameters')
+        name_node = func_declarator.child_by_field_name('declarator')
+
+        type_text = get_node_text(type_node, source).strip()
+        if type_text == "void":
+            type_text = "" # Omit void return type
+
+        func_name = get_node_text(name_node, source, '[unnamed_func]')
+        params_text = get_node_text(params_node, source, '()')
+        params_text = join_lines(params_text, ' ') if '\n' in params_text or '\r' in params_text else params_text.strip()
+
+        full_sig = f"{type_text} {func_name}{params_text}".strip()
+        summary.append((indent_level, "FUNC_DECL", full_sig))
+        return
+    if specifier_node and not specifier_node.child_by_field_name('body'):
+        declaration_text = get_node_text(node, source).strip().replace('\n', ' ').replace(';', '')
+        summary.append((indent_level, "FORWARD_DECL", declaration_text))
+        return
+    type_node = node.child_by_field_name('type')
+    type_text = get_node_text(type_node, source, '<unknown_type>').strip()
+
+    for child_node in children:
+        if 'declarator' in child_node.type:
+            name_node = innermost_declarator(child_node, declarator_field_id)
+
+            name_text = get_node_text(name_node, source).strip()
+
+            if name_text and name_text != type_text:
+                summary.append((indent_level, "FIELD", f"{type_text} {name_text}"))
+
+
+_CPP_HANDLERS = {
+    "translation_unit": _cpp_translation_unit,
+    "preproc_include": _cpp_preproc_include,
+    "namespace_definition": _cpp_namespace_definition,
+    "class_specifier": _cpp_type_specifier,
+    "struct_specifier": _cpp_type_specifier,
+    "union_specifier": _cpp_type_specifier,
+    "function_definition": _cpp_function_definition,
+    "declaration": _cpp_declaration,
+    "field_declaration": _cpp_declaration,
+}
+
+
+def analyze_cpp_node(node, source, summary, includes, indent_level=0):
+    handlers = get_kind_handlers("cpp", _CPP_HANDLERS)
+    stack = [(node, indent_level)]
+    while stack:
+        node, indent_level = stack.pop()
+        handler = handlers.get(node.kind_id)
+        if handler:
+            # Entries carry their depth; process_cpp() builds the indentation when it formats them
+            handler(node, source, summary, includes, stack, indent_level)
+
+
+# Member types print in this order, any other types after them alphabetically
+CPP_MEMBER_TYPE_RANK = {"FIELD": 0, "CONSTRUCTOR": 1, "DESTRUCTOR": 2, "FUNC": 3, "FUNC_DECL": 4}
+# Top-level entries whose nested entries are grouped by format_cpp_block()
+CPP_BLOCK_TYPES = frozenset({"CLASS", "STRUCT", "NAMESPACE"})
+
+
+def format_cpp_block(members, base_indent):
+    """Groups the (type, text) members of a block (like a class body) by type, under one header per type."""
+    other_rank = len(CPP_MEMBER_TYPE_RANK)
+    # Grouped items keep only the first line of their text
+    entries = [
+        (CPP_MEMBER_TYPE_RANK.get(type_key, other_rank), type_key, text.lstrip().partition('\n')[0].strip())
+        for type_key, text in members
+    ]
+    # One sort puts the groups in order and sorts the items inside each group
+    entries.sort()
+
+    output_lines = []
+    current_type = None
+    for _, type_key, item in entries:
+        if type_key != current_type:
+            output_lines.append(f"{base_indent}{type_key}:")
+            current_type = type_key
+        output_lines.append(f"{base_indent}  {item}")
+    return output_lines
+
+
+@functools.lru_cache(maxsize=4096)
+def split_cpp_qualifiers(qualifiers):
+    """
+    Splits the part of an out-of-class definition before its last '::' ("const Foo& Bar")
+    into (class_name, return_type). Cached, since a .cpp file defines many members of the same class.
+    """
+    qualifiers_parts = qualifiers.split()
+    return qualifiers_parts[-1], " ".join(qualifiers_parts[:-1])
+
+
+def process_cpp(file_path, source_bytes):
     """Wrapper function to process a single C/C++/Header file with intelligent grouping."""
+    parser = get_parser("cpp")
+    summary = []
     if not parser:
-        return
+        return summary
     try:
-        with open(file_path, "rb") as f:
-            source_bytes = f.read()
-
         tree = parser.parse(source_bytes)
 
         file_summary_raw = []
-        includes_list = []
-        analyze_cpp_node(tree.root_node, source_bytes, file_summary_raw, includes_list)
+        includes = set()
+        analyze_cpp_node(tree.root_node, decode_for_slicing(source_bytes), file_summary_raw, includes)
 
-        if not file_summary_raw and not includes_list:
-            return
+        if not file_summary_raw and not includes:
+            return summary
 
         summary.append(f"\n-- FILE: {file_path} (C/C++) --")
-        if includes_list:
-            summary.append(f"  INCLUDES: {', '.join(sorted(list(set(includes_list))))}")
-
-        # This helper function groups a block of lines (like a class body)
-        def format_block(lines, base_indent):
-            groups = defaultdict(list)
-            for line in lines:
-                match = re.match(r'^\s*(?P<type>\w+):\s*(?P<text>.*)', line)
-                if match:
-                    groups[match.group('type')].append(match.group('text').strip())
-            
-            output_lines = []
-            # Define a consistent order for printing member types
-            type_order = ["FIELD", "CONSTRUCTOR", "DESTRUCTOR", "FUNC", "FUNC_DECL"]
-            for type_key in type_order:
-                if type_key in groups:
-                    output_lines.append(f"{base_indent}{type_key}:")
-                    for item in sorted(groups[type_key]):
-                        output_lines.append(f"{base_indent}  {item}")
-            # Add any other types not in the standard order
-            for type_key, items in sorted(groups.items()):
-                if type_key not in type_order:
-                    output_lines.append(f"{base_indent}{type_key}:")
-                    for item in sorted(items):
-                         output_lines.append(f"{base_indent}  {item}")
-            return output_lines
+        if includes:
+            summary.append(f"  INCLUDES: {', '.join(sorted(includes))}")
 
         # --- Main Processing ---
-        final_body = []
-        
+        # Lines go straight into summary: encode_summary() joins them with the same "\n" as a separate body would
         # First, handle .cpp file definitions by grouping them into classes
         class_definitions = defaultdict(list)
-        other_lines = []
-        for line in file_summary_raw:
-            if not line.startswith(' ') and '::' in line:
-                match = re.match(r'^(?P<type>\w+):\s*(?P<signature>.*)', line)
-                if match:
-                    sig = match.group('signature')
-                    try:
-                        # Split "return_type class_name::func_name(args)"
-                        qualifiers, member_name = sig.rsplit('::', 1)
-                        qualifiers_parts = qualifiers.split()
-                        class_name = qualifiers_parts[-1]
-                        return_type = " ".join(qualifiers_parts[:-1])
-
-                        # Reconstruct the signature without the class name
-                        clean_sig = f"{return_type} {member_name}".strip()
-                        class_definitions[class_name].append(f"  {match.group('type')}: {clean_sig}")
-                        continue
-                    except ValueError:
-                        # Fallback for parsing errors
-                        pass
-            other_lines.append(line)
-
-        # Process the remaining lines (from headers or globals)
+        other_entries = []
+        for entry in file_summary_raw:
+            depth, type_key, text = entry
+            if depth == 0 and '::' in text:
+                # Split "return_type class_name::func_name(args)"
+                sig = text.lstrip().partition('\n')[0]
+                qualifiers, _, member_name = sig.rpartition('::')
+                # qualifiers is empty when there is no '::' or nothing before it; such entries are kept as they are
+                if qualifiers:
+                    class_name, return_type = split_cpp_qualifiers(qualifiers)
+
+                    # Reconstruct the signature without the class name
+                    clean_sig = f"{return_type} {member_name}".strip()
+                    class_definitions[class_name].append((type_key, clean_sig))
+                    continue
+            other_entries.append(entry)
+
+        # Process the remaining entries (from headers or globals)
         i = 0
-        while i < len(other_lines):
-            line = other_lines[i]
-            # Match top-level containers like CLASS, STRUCT, NAMESPACE
-            match = re.match(r'^(?P<indent>\s*)(?P<type>CLASS|STRUCT|NAMESPACE):\s*(?P<name>.*)', line)
-            if match:
-                final_body.append(line)
-                block_indent_len = len(match.group('indent'))
-                block_body_lines = []
-                # Collect all lines belonging to this block
-                j = i + 1
-                while j < len(other_lines):
-                    next_line = other_lines[j]
-                    next_line_indent_match = re.match(r'^(\s*)', next_line)
-                    next_line_indent_len = len(next_line_indent_match.group(1)) if next_line_indent_match else 0
-                    
-                    if next_line_indent_len > block_indent_len:
-                        block_body_lines.append(next_line)
-                        j += 1
-                    else:
-                        break # End of block
-                
-                if block_body_lines:
-                    child_indent = match.group('indent') + '  '
-                    final_body.extend(format_block(block_body_lines, child_indent))
-                
+        num_other_entries = len(other_entries)
+        while i < num_other_entries:
+            depth, type_key, text = other_entries[i]
+            indent = _INDENTS[depth] if depth < _MAX_INDENTS else "  " * depth
+            summary.append(f"{indent}{type_key}: {text}")
+            i += 1
+            # Top-level containers like CLASS, STRUCT, NAMESPACE take every following deeper entry
+            if type_key in CPP_BLOCK_TYPES:
+                j = i
+                while j < num_other_entries and other_entries[j][0] > depth:
+                    j += 1
+                if j > i:
+                    members = [(member_type, member_text) for _, member_type, member_text in other_entries[i:j]]
+                    summary.extend(format_cpp_block(members, indent + "  "))
                 i = j # Move main index past the processed block
-            else:
-                final_body.append(line)
-                i += 1
 
         # Append the formatted .cpp class definitions
-        for class_name, lines in sorted(class_definitions.items()):
-            final_body.append(f"CLASS: {class_name}")
-            final_body.extend(format_block(lines, "  "))
-
-        summary.extend(final_body)
+        for class_name, members in sorted(class_definitions.items()):
+            summary.append(f"CLASS: {class_name}")
+            summary.extend(format_cpp_block(members, "  "))
 
     except Exception as e:
         summary.append(f"\n-- FILE: {file_path} (C/C++) --")
         summary.append(f"  Error processing {file_path}: {e}")
+    return summary
+
+
+# --- Parser Cache ---
+LANGUAGE_NAMES = ("csharp", "javascript", "html", "python", "cpp")
+LANGUAGE_LABELS = {"csharp": "C#", "javascript": "JavaScript", "html": "HTML", "python": "Python", "cpp": "C++"}
+
+_PARSERS = {}
+_PARSERS_LOCK = threading.Lock()
+
+
+def get_parser(lang_name):
+    """
+    Returns the Parser for lang_name, or None if that language is unavailable.
+    The language package is imported and the parser created on first use, then reused for every later file,
+    so languages that no scanned file needs are never loaded.
+    """
+    if lang_name in _PARSERS:
+        return _PARSERS[lang_name]
+
+    with _PARSERS_LOCK:
+        if lang_name not in _PARSERS:
+            parser = None
+            capsule = load_pip_language(lang_name)
+            label = LANGUAGE_LABELS[lang_name]
+            if capsule:
+                try:
+                    parser = Parser()
+                    parser.language = Language(capsule)
+                    if _verbose:
+                        print(f"Created {label} parser.")
+                except Exception as e:
+                    print(f"Error creating {label} parser: {e}")
+                    parser = None
+            _PARSERS[lang_name] = parser
+    return _PARSERS[lang_name]
+
+
+# Queries are compiled once per language and query source, then reused.
+_QUERIES = {}
+
+
+def get_query(lang_name, query_source):
+    """Returns the compiled query for lang_name. The language's parser must be available."""
+    key = (lang_name, query_source)
+    if key in _QUERIES:
+        return _QUERIES[key]
+
+    parser = get_parser(lang_name)
+    with _PARSERS_LOCK:
+        if key not in _QUERIES:
+            _QUERIES[key] = parser.language.query(query_source)
+    return _QUERIES[key]
+
+
+_FIELD_IDS = {}
+
+
+def get_field_id(lang_name, field_name):
+    """Returns the numeric id of a field, so hot loops can use child_by_field_id() instead of hashing names."""
+    key = (lang_name, field_name)
+    if key not in _FIELD_IDS:
+        _FIELD_IDS[key] = get_parser(lang_name).language.field_id_for_name(field_name)
+    return _FIELD_IDS[key]
+
+
+_KIND_HANDLERS = {}
+
+
+def get_kind_handlers(lang_name, handlers):
+    """
+    Re-keys a {node type: handler} table by numeric kind id, so walkers dispatch on node.kind_id
+    instead of building a node.type string for every node. Every kind id carrying a name maps,
+    since grammars reuse a name for several ids (aliases).
+    """
+    if lang_name not in _KIND_HANDLERS:
+        language = get_parser(lang_name).language
+        kind_handlers = {}
+        for kind_id in range(language.node_kind_count):
+            handler = handlers.get(language.node_kind_for_id(kind_id))
+            if handler:
+                kind_handlers[kind_id] = handler
+        _KIND_HANDLERS[lang_name] = kind_handlers
+    return _KIND_HANDLERS[lang_name]
+
+
+# --- Summary Cache ---
+# With --cache_dir, every file's encoded summary is kept in one SQLite file, next to a stamp of the file
+# version it was made from. Only the main process touches the database; workers never see the cache.
+_summary_cache_salt = None
+
+
+def _get_summary_cache_salt():
+    """Changes whenever this script or an installed tree-sitter package does, so no stale summary is ever reused."""
+    global _summary_cache_salt
+    if _summary_cache_salt is None:
+        salt = hashlib.blake2b(read_source_bytes(os.path.abspath(__file__)), digest_size=16)
+        # Upgrading the bindings or a grammar can change what a file parses into
+        package_names = ["tree-sitter"] + [module_name.replace("_", "-") for module_name, _, _ in LANGUAGE_PACKAGES.values()]
+        for package_name in package_names:
+            salt.update(f"|{package_name}={get_package_version(package_name)}".encode("utf-8"))
+        # Which files are listed as skipped depends on the size limit
+        salt.update(f"|max_parse_bytes={_max_parse_bytes}".encode("ascii"))
+        _summary_cache_salt = salt.digest()
+    return _summary_cache_salt
+
+
+def open_summary_cache(cache_dir):
+    """Opens the summary cache in cache_dir, creating the folder and database if needed."""
+    os.makedirs(cache_dir, exist_ok=True)
+    cache = sqlite3.connect(os.path.join(cache_dir, "summaries.sqlite"))
+    try:
+        # Losing the cache only costs a re-parse, so don't wait for the disk on every commit
+        cache.execute("PRAGMA synchronous=OFF")
+        cache.execute("CREATE TABLE IF NOT EXISTS summaries (file BLOB PRIMARY KEY, stamp BLOB, summary BLOB)")
+    except sqlite3.Error:
+        cache.close()
+        raise
+    return cache
+
+
+def summary_cache_key(file_path):
+    """One row per file: the path as given (it appears in the summary) and the absolute path it resolved to."""
+    return hashlib.blake2b(f"{file_path}|{os.path.abspath(file_path)}".encode("utf-8", "surrogateescape"), digest_size=20).digest()
+
+
+def summary_cache_stamp(file_path, file_kind):
+    """Identifies the version of a file that a summary was made from, or returns None if the file can't be stat'ed."""
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return None
+    stamp = hashlib.blake2b(_get_summary_cache_salt(), digest_size=16)
+    # A summary made while one of the file's languages was missing must not outlive the missing package
+    stamp.update(bytes(get_parser(lang_name) is not None for lang_name in KIND_LANGUAGES[file_kind]))
+    stamp.update(f"{stat_result.st_mtime_ns}|{stat_result.st_size}".encode("ascii"))
+    return stamp.digest()
+
+
+def summarize_with_cache(cache, file_paths, file_kinds, summarize):
+    """
+    Yields every file's encoded summary in order. Unchanged files come from the cache, the others are
+    handed to summarize(file_paths, file_kinds), which yields their summaries in order, and get stored.
+    A cache that can't be read or written (locked, corrupted) is warned about and then left alone.
+    """
+    file_keys = [summary_cache_key(file_path) for file_path in file_paths]
+    stamps = [summary_cache_stamp(file_path, file_kind) for file_path, file_kind in zip(file_paths, file_kinds)]
+    cached_summaries = []
+    try:
+        for file_key, stamp in zip(file_keys, stamps):
+            row = cache.execute("SELECT stamp, summary FROM summaries WHERE file = ?", (file_key,)).fetchone()
+            cached_summaries.append(row[1] if row and stamp is not None and row[0] == stamp else None)
+    except sqlite3.Error as e:
+        print(f"Warning: Could not read the summary cache, parsing every file: {e}")
+        cache = None
+        cached_summaries = [None] * len(file_paths)
+
+    missing = [i for i, encoded_summary in enumerate(cached_summaries) if encoded_summary is None]
+    fresh_summaries = summarize([file_paths[i] for i in missing], [file_kinds[i] for i in missing])
+    for file_key, stamp, encoded_summary in zip(file_keys, stamps, cached_summaries):
+        if encoded_summary is None:
+            encoded_summary = next(fresh_summaries)
+            # Don't keep failures around, they may not happen next time
+            if cache and stamp is not None and b"  Error processing " not in encoded_summary:
+                try:
+                    cache.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (file_key, stamp, encoded_summary))
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not update the summary cache: {e}")
+                    cache = None
+        yield encoded_summary
+    if cache:
+        try:
+            # Drop the rows of files that were deleted, renamed or are no longer scanned, so the cache
+            # only ever holds this run's files
+            cache.execute("CREATE TEMP TABLE IF NOT EXISTS scanned (file BLOB PRIMARY KEY)")
+            cache.execute("DELETE FROM scanned")
+            cache.executemany("INSERT OR IGNORE INTO scanned VALUES (?)", ((file_key,) for file_key in file_keys))
+            cache.execute("DELETE FROM summaries WHERE file NOT IN (SELECT file FROM scanned)")
+            cache.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not update the summary cache: {e}")
+
+
+# --- Parallel Processing ---
+def _init_worker(lang_names, max_parse_bytes):
+    """ProcessPoolExecutor initializer: takes the main process's settings and creates the parsers of lang_names once per worker, quietly."""
+    global _max_parse_bytes
+    _max_parse_bytes = max_parse_bytes
+    with contextlib.redirect_stdout(io.StringIO()):
+        for lang_name in lang_names:
+            get_parser(lang_name)
+
+
+# File extension (without the dot) -> kind of file, and kind -> function that summarizes it.
+FILE_KINDS = {
+    "cs": "csharp",
+    "js": "javascript",
+    "cshtml": "cshtml",
+    "py": "python",
+    "cpp": "cpp", "h": "cpp", "c": "cpp", "hpp": "cpp",
+}
+# Languages each kind of file is parsed with (CSHTML embeds JavaScript and C#)
+KIND_LANGUAGES = {
+    "csharp": ("csharp",),
+    "javascript": ("javascript",),
+    "cshtml": ("html", "javascript", "csharp"),
+    "python": ("python",),
+    "cpp": ("cpp",),
+}
+# Name of each kind in the summary's file lines
+KIND_LABELS = {"csharp": "C#", "javascript": "JavaScript", "cshtml": "CSHTML", "python": "Python", "cpp": "C/C++"}
+PROCESSORS = {
+    "csharp": process_csharp,
+    "javascript": process_javascript,
+    "cshtml": process_cshtml,
+    "python": process_python,
+    "cpp": process_cpp,
+}
+
+
+def encode_summary(file_lines):
+    """
+    Joins a file's summary entries into the bytes written to the output file:
+    UTF-8, with the platform's line endings like text mode would have used. Empty summaries give b"".
+    """
+    text = "\n".join(file_lines)
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
+def _process_one(file_path, file_kind):
+    """
+    Summarizes a single file, returning its encoded summary (see encode_summary).
+    Files not worth parsing (empty, blank, too big or binary) are settled here, before their processor runs.
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        if file_size == 0:
+            # Nothing to summarize, so don't open the file or start a parse
+            return b""
+        if _max_parse_bytes and file_size > _max_parse_bytes:
+            return encode_summary([f"\n-- FILE: {file_path} (skipped: {file_size} bytes) --"])
+        source_bytes = read_source_bytes(file_path)
+    except OSError as e:
+        return encode_summary([f"\n-- FILE: {file_path} ({KIND_LABELS[file_kind]}) --", f"  Error processing {file_path}: {e}"])
+    if source_bytes.isspace():
+        return b""
+    if looks_binary(source_bytes):
+        return encode_summary([f"\n-- FILE: {file_path} (skipped: binary) --"])
+    return encode_summary(PROCESSORS[file_kind](file_path, source_bytes))
+
+
+def _process_chunk(file_paths, file_kinds):
+    """Summarizes a run of consecutive files in one worker task."""
+    return [_process_one(file_path, file_kind) for file_path, file_kind in zip(file_paths, file_kinds)]
+
+
+def map_in_order(pool, file_paths, file_kinds, chunksize, max_pending):
+    """
+    Like pool.map(_process_one, ...) with a chunksize, but only keeps max_pending chunks submitted at once.
+    pool.map() queues every chunk up front, so finished chunks pile up in memory while an early one is still running;
+    here the oldest chunk's results are yielded before another chunk is submitted. Results stay in walk order.
+    """
+    pending = deque()
+    for start in range(0, len(file_paths), chunksize):
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+        end = start + chunksize
+        pending.append(pool.submit(_process_chunk, file_paths[start:end], file_kinds[start:end]))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def summarize_files(file_paths, file_kinds, lang_names, jobs):
+    """
+    Yields the encoded summary of each file, in order. Files are independent, so when there are enough
+    of them they are spread over worker processes that each create the parsers of lang_names.
+    """
+    # No more workers than files: each one pays for its own parser setup
+    num_workers = min(jobs or os.cpu_count() or 1, len(file_paths))
+    # A single worker (e.g. on a 1-CPU machine) would only add that setup and the round trips
+    if num_workers <= 1 or len(file_paths) < MIN_FILES_FOR_POOL:
+        yield from map(_process_one, file_paths, file_kinds)
+        return
+
+    # About four chunks per worker keeps them evenly loaded, while capping the size
+    # means big trees still send many files per round trip without long stragglers.
+    chunksize = max(1, min(64, len(file_paths) // (num_workers * 4)))
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(lang_names, _max_parse_bytes)) as pool:
+        yield from map_in_order(pool, file_paths, file_kinds, chunksize, num_workers * 4)
+
+
+def write_summaries(out_file, encoded_summaries):
+    """Writes the encoded per-file summaries to out_file (opened in binary mode) one after another, without keeping them around."""
+    newline = os.linesep.encode("utf-8")
+    is_first = True
+    for encoded_summary in encoded_summaries:
+        if not encoded_summary:
+            continue
+        if not is_first:
+            out_file.write(newline)
+        out_file.write(encoded_summary)
+        is_first = False
+
+
+def find_source_files(scan_directory):
+    """
+    Walks scan_directory in os.walk() order, without descending into excluded or symlinked folders,
+    and returns (file_paths, file_kinds) for every file with a known extension.
+    Uses os.scandir() directly, so entries are sorted out by name and cached type
+    without building os.walk()'s per-directory name lists.
+    """
+    file_paths = []
+    file_kinds = []
+    pending = [scan_directory]
+    while pending:
+        root = pending.pop()
+        # join(root, "") adds a separator only when root lacks one, so the prefix + name below matches join(root, name)
+        root_prefix = os.path.join(root, "")
+        dir_paths = []
+        dir_files = []
+        dir_kinds = []
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if name not in excluded_dir_names and not entry.is_symlink():
+                            dir_paths.append(root_prefix + name)
+                        continue
+                    _, dot, extension = name.rpartition(".")
+                    file_kind = FILE_KINDS.get(extension) if dot else None
+                    if file_kind:
+                        dir_files.append(root_prefix + name)
+                        dir_kinds.append(file_kind)
+        except OSError:
+            continue # like os.walk(), skip folders that can't be listed
+        file_paths += dir_files
+        file_kinds += dir_kinds
+        # Reversed, so subfolders pop off the stack in listing order
+        pending.extend(reversed(dir_paths))
+    return file_paths, file_kinds
+
 
 # --- Main Processing Logic ---
+def get_tree_sitter_version():
+    """Returns the installed tree-sitter version, or "unknown" if its package metadata can't be read."""
+    ts_version_str = get_package_version("tree-sitter")
+    if ts_version_str is None:
+        print("Warning: Could not determine tree-sitter version automatically.")
+        return "unknown"
+    return ts_version_str
+
+
+def non_negative_int(text):
+    """argparse type for counts and sizes, where 0 picks the default behaviour (see each option's help)."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"must be a whole number, got {text!r}")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {value}")
+    return value
+
+
 def main():
     parser_args = argparse.ArgumentParser(description="Extract code structure summary from .cs, .js, .cshtml, and .py files.")
     parser_args.add_argument("--scan_directory", help="Directory to scan recursively (e.g., '.').", default=".")
     parser_args.add_argument("--output_file", help="File to write the summary to.", default="./CODE_SUMMARY.txt")
+    parser_args.add_argument("--jobs", type=non_negative_int, help="Number of worker processes (default or 0: one per CPU core, 1 disables parallelism).", default=None)
+    parser_args.add_argument("--cache_dir", help="Directory to cache per-file summaries in, so unchanged files aren't parsed again on the next run (default: no cache).", default=None)
+    parser_args.add_argument("--max_file_bytes", type=non_negative_int, help=f"Files bigger than this are listed as skipped instead of parsed (default: {MAX_PARSE_BYTES}, 0: no limit).", default=MAX_PARSE_BYTES)
+    parser_args.add_argument("--verbose", action="store_true", help="Print the tree-sitter version and language loading progress.")
     args = parser_args.parse_args()
 
+    global _verbose, _max_parse_bytes
+    _verbose = args.verbose
+    _max_parse_bytes = args.max_file_bytes
+    if _verbose:
+        print(f"Using tree-sitter version: {get_tree_sitter_version()}")
+
     output_dir = os.path.dirname(args.output_file)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
 
-    loaded_capsules = load_pip_languages()
-    if not loaded_capsules: 
-        print("Failed to load any languages from pip packages. Exiting.") 
-        return
-
-    CSHARP_LANG_CAPSULE, JAVASCRIPT_LANG_CAPSULE, HTML_LANG_CAPSULE, PYTHON_LANG_CAPSULE, CPP_LANG_CAPSULE = loaded_capsules
+    file_paths, file_kinds = find_source_files(args.scan_directory)
 
-    CSHARP_LANGUAGE_OBJ, JAVASCRIPT_LANGUAGE_OBJ, HTML_LANGUAGE_OBJ, PYTHON_LANGUAGE_OBJ, CPP_LANGUAGE_OBJ = None, None, None, None, None
+    # Only load the languages that the files found actually need
+    needed_lang_names = {lang_name for file_kind in set(file_kinds) for lang_name in KIND_LANGUAGES[file_kind]}
+    lang_names = [lang_name for lang_name in LANGUAGE_NAMES if lang_name in needed_lang_names]
+    if _verbose:
+        print("Attempting to load languages from installed pip packages...")
+        print(f"Python sys.path: {sys.path}")
+    if lang_names and not any([get_parser(lang_name) for lang_name in lang_names]):
+        print("Error: No tree-sitter language packages could be loaded.")
+        print("Please ensure you have installed the necessary packages, e.g.:")
+        print("  pip install tree-sitter-c-sharp tree-sitter-javascript tree-sitter-html tree-sitter-python tree-sitter-cpp")
+        print("Failed to load any languages from pip packages. Exiting.")
+        return
 
-    if CSHARP_LANG_CAPSULE:
-        try:
-            CSHARP_LANGUAGE_OBJ = Language(CSHARP_LANG_CAPSULE)
-            print(f"Wrapped C# capsule into Language object.")
-        except Exception as e:
-            print(f"Error wrapping C# capsule with Language(): {e}")
-    if JAVASCRIPT_LANG_CAPSULE:
+    # A cache that can't be used only costs speed, so carry on without it.
+    # It is opened before the output file, which would otherwise already be truncated.
+    cache = None
+    if args.cache_dir:
         try:
-            JAVASCRIPT_LANGUAGE_OBJ = Language(JAVASCRIPT_LANG_CAPSULE)
-            print(f"Wrapped JavaScript capsule into Language object.")
-        except Exception as e:
-            print(f"Error wrapping JavaScript capsule with Language(): {e}")
-    if HTML_LANG_CAPSULE:
-        try:
-            HTML_LANGUAGE_OBJ = Language(HTML_LANG_CAPSULE)
-            print(f"Wrapped HTML capsule into Language object.")
-        except Exception as e:
-            print(f"Error wrapping HTML capsule with Language(): {e}")
-    if PYTHON_LANG_CAPSULE:
-        try:
-            PYTHON_LANGUAGE_OBJ = Language(PYTHON_LANG_CAPSULE)
-            print(f"Wrapped Python capsule into Language object.")
-        except Exception as e:
-            print(f"Error wrapping Python capsule with Language(): {e}")
-            
-    if CPP_LANG_CAPSULE:
-        try:
-            CPP_LANGUAGE_OBJ = Language(CPP_LANG_CAPSULE)
-            print(f"Wrapped C++ capsule into Language object.")
-        except Exception as e:
-            print(f"Error wrapping C++ capsule with Language(): {e}")
-
-    cs_parser, js_parser, html_parser, py_parser, cpp_parser = None, None, None, None, None
-
-    if CSHARP_LANGUAGE_OBJ:
-        cs_parser = Parser()
-        cs_parser.language = CSHARP_LANGUAGE_OBJ 
-        print("Successfully set C# language to cs_parser.")
-
-    if JAVASCRIPT_LANGUAGE_OBJ:
-        js_parser = Parser()
-        js_parser.language = JAVASCRIPT_LANGUAGE_OBJ
-        print("Successfully set JavaScript language to js_parser.")
-        
-    if HTML_LANGUAGE_OBJ:
-        html_parser = Parser()
-        html_parser.language = HTML_LANGUAGE_OBJ
-        print("Successfully set HTML language to html_parser.")
-
-    if PYTHON_LANGUAGE_OBJ:
-        py_parser = Parser()
-        py_parser.language = PYTHON_LANGUAGE_OBJ
-        print("Successfully set Python language to py_parser.")
-
-    if CPP_LANGUAGE_OBJ:
-        cpp_parser = Parser()
-        cpp_parser.language = CPP_LANGUAGE_OBJ
-        print("Successfully set C++ language to cpp_parser.")
-    else:
-        print("C/C++ parser will not be available.")
-
-    project_summary = []
-
-    for root, dirs, files in os.walk(args.scan_directory, topdown=True):
-        dirs[:] = [d for d in dirs if d not in excluded_dir_names]
-
-        for file in files:
-            file_path = os.path.join(root, file)
-
-            if file.endswith(".cs"):
-                process_csharp(file_path, cs_parser, project_summary)
-            elif file.endswith(".js"):
-                 process_javascript(file_path, js_parser, project_summary)
-            elif file.endswith(".cshtml"):
-                process_cshtml(file_path, html_parser, js_parser, cs_parser, project_summary)
-            elif file.endswith(".py"):
-                process_python(file_path, py_parser, project_summary)
-            elif file.endswith((".cpp", ".h", ".c", ".hpp")):
-                process_cpp(file_path, cpp_parser, project_summary)
+            cache = open_summary_cache(args.cache_dir)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: Could not open the summary cache in '{args.cache_dir}', continuing without it: {e}")
 
+    # Summaries are written out in walk order as soon as they arrive (see summarize_files)
     try:
-        with open(args.output_file, "w", encoding="utf-8") as f:
-            if project_summary and project_summary[0].strip() == "":
-                project_summary.pop(0)
-            f.write("\n".join(project_summary))
+        with open(args.output_file, "wb", buffering=1 << 20) as f:
+            if cache:
+                encoded_summaries = summarize_with_cache(
+                    cache, file_paths, file_kinds,
+                    lambda paths, kinds: summarize_files(paths, kinds, lang_names, args.jobs))
+            else:
+                encoded_summaries = summarize_files(file_paths, file_kinds, lang_names, args.jobs)
+            write_summaries(f, encoded_summaries)
         print(f"\nSummary written to {os.path.abspath(args.output_file)}")
     except Exception as e:
         print(f"\nError writing summary to file '{args.output_file}': {e}")
+    finally:
+        if cache:
+            cache.close()
 
 if __name__ == "__main__":
-    ts_version_str = "unknown"
-    try:
-        from importlib import metadata
-        ts_version_str = metadata.version('tree-sitter')
-    except ImportError:
-        try:
-            import pkg_resources
-            ts_version_str = pkg_resources.get_distribution('tree-sitter').version
-        except Exception:
-            print("Warning: Could not determine tree-sitter version automatically.")
-            pass
-
-    print(f"Using tree-sitter version: {ts_version_str}")
-    main()
\ No newline at end of file
+    main()